@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
-from db.data_loader import get_invoice_data, get_dispute_data, get_customer_phone
+from db.data_loader import get_open_disputes, count_open_disputes
 from services.twilio_service import TwilioMessageService
+from services.dispute_queue import dispute_key, get_dispute_prefetcher
 from datetime import datetime
+import os
 from services.ai_service import GeminiAIService
+from services.stripe_service import StripeEvidenceService
+from utils.artifact_store import get_artifact_store
 
 # Configure page to use wide layout
 st.set_page_config(
@@ -14,6 +18,66 @@ st.set_page_config(
 
 st.title("🛡️ STAMP Dispute Tool")
 
+QUEUE_PAGE_SIZE = 25
+QUEUE_LOOKAHEAD = 3
+
+# Large artifacts live in the process-wide store, shared by sessions viewing the same dispute;
+# session_state only keeps their string keys
+artifact_store = get_artifact_store()
+# Loads dispute bundles into the store; shared so sessions on the same queue load each dispute once
+dispute_prefetcher = get_dispute_prefetcher()
+
+def open_dispute(dispute_id: str, max_age: float = None):
+    dispute_prefetcher.get(dispute_id, max_age)
+    st.session_state.dispute_id = dispute_id
+    st.session_state.dispute_key = dispute_key(dispute_id)
+    # Drop SMS handles that belong to the previously opened dispute
+    for key in ('messages_key', 'messages_pdf_key', 'messages_summary_key'):
+        st.session_state.pop(key, None)
+
+def read_artifact_file(key: str) -> bytes:
+    # Raising makes the download fail visibly; an empty file could end up attached as evidence
+    path = artifact_store.get_path(key)
+    if not path:
+        raise FileNotFoundError("The SMS report has expired. Generate it again.")
+    with open(path, "rb") as f:
+        return f.read()
+
+def session_artifact(name: str):
+    key = st.session_state.get(f"{name}_key")
+    return artifact_store.get(key) if key else None
+
+def load_queue_page(page: int):
+    # queue_cursors[page] is the (EvidenceDueBy, ExternalPaymentDisputeId) keyset cursor the page starts after
+    cursors = st.session_state.get('queue_cursors', [None])[:page + 1]
+    # One extra row tells whether there is a next page and lets its first dispute be prefetched
+    rows = get_open_disputes(cursors[page], QUEUE_PAGE_SIZE + 1)
+    page_df = rows.head(QUEUE_PAGE_SIZE)
+
+    st.session_state.queue_page = page
+    st.session_state.queue_df = page_df
+    st.session_state.queue_next_id = None
+    if len(rows) > QUEUE_PAGE_SIZE:
+        st.session_state.queue_next_id = str(rows['ExternalPaymentDisputeId'].iloc[QUEUE_PAGE_SIZE])
+        last = page_df.iloc[-1]
+        due_by = last['EvidenceDueByCursor']
+        # pandas hands back a Timestamp; the driver binds plain datetimes
+        if isinstance(due_by, pd.Timestamp):
+            due_by = due_by.to_pydatetime()
+        cursors.append((due_by, last['ExternalPaymentDisputeId']))
+    st.session_state.queue_cursors = cursors
+    st.session_state.queue_position = 0
+
+def open_queue_position(position: int):
+    queue_ids = st.session_state.queue_df['ExternalPaymentDisputeId'].astype(str).tolist()
+    st.session_state.queue_position = position
+    open_dispute(queue_ids[position])
+
+    upcoming = queue_ids[position + 1:]
+    if st.session_state.queue_next_id:
+        upcoming.append(st.session_state.queue_next_id)
+    dispute_prefetcher.prefetch(upcoming[:QUEUE_LOOKAHEAD])
+
 # Sidebar inputs
 with st.sidebar:
     st.header("Query Inputs")
@@ -22,58 +86,120 @@ with st.sidebar:
     if st.button("Get Data", use_container_width=True):
         # Store results in session state
         if dispute_id:
-            # First get dispute data
-            st.session_state.dispute_data = get_dispute_data(dispute_id)
-            
-            # Then automatically get invoice data using ServiceId from dispute
-            if not st.session_state.dispute_data.empty and 'ServiceId' in st.session_state.dispute_data.columns:
-                service_id = st.session_state.dispute_data['ServiceId'].iloc[0]
-                if service_id:
-                    st.session_state.invoice_data = get_invoice_data(service_id)
-                    
-                    # Get customer phone number
-                    if not st.session_state.invoice_data.empty and 'CustomerId' in st.session_state.invoice_data.columns:
-                        customer_id = st.session_state.invoice_data['CustomerId'].iloc[0]
-                        st.session_state.customer_phone = get_customer_phone(customer_id)
-                else:
-                    st.session_state.invoice_data = pd.DataFrame()
-                    st.session_state.customer_phone = None
-            else:
-                st.session_state.invoice_data = pd.DataFrame()
-                st.session_state.customer_phone = None
+            # An explicit lookup always reloads from the database
+            open_dispute(dispute_id, max_age=0)
+
+    # Work queue of open disputes, earliest evidence due date first
+    st.header("Work Queue")
+    if st.button("Load Open Disputes", use_container_width=True):
+        st.session_state.queue_total = count_open_disputes()
+        load_queue_page(0)
+        if not st.session_state.queue_df.empty:
+            open_queue_position(0)
+
+    if hasattr(st.session_state, 'queue_df'):
+        queue_df = st.session_state.queue_df
+        page = st.session_state.queue_page
+        total = st.session_state.get('queue_total', 0)
+
+        if queue_df.empty:
+            st.info("No open disputes")
+        else:
+            position = st.session_state.queue_position
+            st.caption(
+                f"Page {page + 1} · item {position + 1} of {len(queue_df)} "
+                f"· {total} open disputes"
+            )
+            st.dataframe(
+                queue_df[['ExternalPaymentDisputeId', 'EvidenceDueBy']],
+                use_container_width=True,
+                hide_index=True
+            )
+
+            col_prev, col_next = st.columns(2)
+            with col_prev:
+                has_previous = position > 0 or page > 0
+                if st.button("◀ Previous", use_container_width=True, disabled=not has_previous):
+                    if position > 0:
+                        open_queue_position(position - 1)
+                    else:
+                        load_queue_page(page - 1)
+                        if not st.session_state.queue_df.empty:
+                            open_queue_position(len(st.session_state.queue_df) - 1)
+                    st.rerun()
+            with col_next:
+                has_next = position + 1 < len(queue_df) or st.session_state.queue_next_id is not None
+                if st.button("Next ▶", use_container_width=True, disabled=not has_next):
+                    if position + 1 < len(queue_df):
+                        open_queue_position(position + 1)
+                    else:
+                        load_queue_page(page + 1)
+                        if not st.session_state.queue_df.empty:
+                            open_queue_position(0)
+                    st.rerun()
+
+    with st.expander("Artifact store"):
+        store_metrics = artifact_store.metrics()
+        mb = 1024 * 1024
+        st.metric(
+            "Memory",
+            f"{store_metrics['memory_bytes'] / mb:.1f} / {store_metrics['memory_cap_bytes'] / mb:.0f} MB"
+        )
+        st.metric(
+            "Disk",
+            f"{store_metrics['disk_bytes'] / mb:.1f} / {store_metrics['disk_cap_bytes'] / mb:.0f} MB"
+        )
+        st.caption(
+            f"{store_metrics['entries']} entries ({store_metrics['disk_entries']} on disk) · "
+            f"{store_metrics['hits']} hits · {store_metrics['misses']} misses · "
+            f"{store_metrics['evictions']} evictions"
+        )
+
+# Resolve the dispute handle; an evicted bundle is transparently reloaded
+dispute_data = invoice_data = None
+customer_phones = []
+skipped_phones = []
+if 'dispute_key' in st.session_state:
+    bundle = artifact_store.get(st.session_state.dispute_key)
+    if bundle is None:
+        bundle = dispute_prefetcher.get(st.session_state.dispute_id)
+    dispute_data = bundle['dispute_data']
+    invoice_data = bundle['invoice_data']
+    customer_phones = bundle['customer_phones']
+    skipped_phones = bundle['skipped_phones']
 
 # Main area - display results using full width
-if hasattr(st.session_state, 'invoice_data') and not st.session_state.invoice_data.empty:
+if invoice_data is not None and not invoice_data.empty:
     st.subheader("Invoice Data")
-    st.dataframe(st.session_state.invoice_data, use_container_width=True)
-elif hasattr(st.session_state, 'invoice_data'):
+    st.dataframe(invoice_data, use_container_width=True)
+elif invoice_data is not None:
     st.info("No invoice data found")
 
-if hasattr(st.session_state, 'dispute_data') and not st.session_state.dispute_data.empty:
+if dispute_data is not None and not dispute_data.empty:
     st.subheader("Dispute Data")
-    st.dataframe(st.session_state.dispute_data, use_container_width=True)
+    st.dataframe(dispute_data, use_container_width=True)
     
     # Add Dispute Type section
     st.subheader("Dispute Type")
     dispute_reason = ""
-    if 'ExternalPaymentDisputeReason' in st.session_state.dispute_data.columns:
-        dispute_reason = str(st.session_state.dispute_data['ExternalPaymentDisputeReason'].iloc[0])
+    if 'ExternalPaymentDisputeReason' in dispute_data.columns:
+        dispute_reason = str(dispute_data['ExternalPaymentDisputeReason'].iloc[0])
     
     st.write(dispute_reason if dispute_reason else 'Unknown')
-elif hasattr(st.session_state, 'dispute_data'):
+elif dispute_data is not None:
     st.info("No dispute data found")
 
 # Show sections only if both data sets exist
-if (hasattr(st.session_state, 'invoice_data') and not st.session_state.invoice_data.empty and 
-    hasattr(st.session_state, 'dispute_data') and not st.session_state.dispute_data.empty):
+if (invoice_data is not None and not invoice_data.empty and 
+    dispute_data is not None and not dispute_data.empty):
     
     # Why should you win this dispute? Section
     st.subheader("⚖️ Why should you win this dispute?")
     
     # Get dispute reason from the data
     dispute_reason = ""
-    if 'ExternalPaymentDisputeReason' in st.session_state.dispute_data.columns:
-        dispute_reason = str(st.session_state.dispute_data['ExternalPaymentDisputeReason'].iloc[0]).lower()
+    if 'ExternalPaymentDisputeReason' in dispute_data.columns:
+        dispute_reason = str(dispute_data['ExternalPaymentDisputeReason'].iloc[0]).lower()
     
     # Define available options based on dispute type (from screenshots analysis)
     def get_available_options(dispute_reason):
@@ -170,13 +296,13 @@ if (hasattr(st.session_state, 'invoice_data') and not st.session_state.invoice_d
     issued_date = "[Invoice Date]"
     company_name = "[Company Name]"
     
-    if hasattr(st.session_state, 'invoice_data') and not st.session_state.invoice_data.empty:
-        if 'CustomerFullName' in st.session_state.invoice_data.columns:
-            customer_name = str(st.session_state.invoice_data['CustomerFullName'].iloc[0])
-        if 'IssuedOn' in st.session_state.invoice_data.columns:
-            issued_date = str(st.session_state.invoice_data['IssuedOn'].iloc[0])
-        if 'CompanyName' in st.session_state.invoice_data.columns:
-            company_name = str(st.session_state.invoice_data['CompanyName'].iloc[0])
+    if invoice_data is not None and not invoice_data.empty:
+        if 'CustomerFullName' in invoice_data.columns:
+            customer_name = str(invoice_data['CustomerFullName'].iloc[0])
+        if 'IssuedOn' in invoice_data.columns:
+            issued_date = str(invoice_data['IssuedOn'].iloc[0])
+        if 'CompanyName' in invoice_data.columns:
+            company_name = str(invoice_data['CompanyName'].iloc[0])
     
     product_description = st.text_area(
         "",
@@ -214,9 +340,17 @@ Travelers register with STAMP and accept our Terms & Conditions, which explain t
     # Documents Section
     st.subheader("📄 Documents")
     
-    # Show customer phone number if available
-    if hasattr(st.session_state, 'customer_phone') and st.session_state.customer_phone:
-        st.write(f"**Customer Phone Number:** {st.session_state.customer_phone}")
+    # Numbers without an international prefix are never guessed, so the agent must check them
+    if skipped_phones:
+        st.warning(
+            f"Left out of the SMS report because they are not stored in international format: "
+            f"{', '.join(skipped_phones)}. Check these numbers in Twilio manually."
+        )
+    
+    # Show customer phone numbers if available
+    if customer_phones:
+        phone_label = "Customer Phone Numbers" if len(customer_phones) > 1 else "Customer Phone Number"
+        st.write(f"**{phone_label}:** {', '.join(customer_phones)}")
         
         # Twilio Messages Section
         st.write("**SMS Messages Report**")
@@ -230,29 +364,60 @@ Travelers register with STAMP and accept our Terms & Conditions, which explain t
             if st.button("Generate SMS Report", use_container_width=True):
                 with st.spinner("Retrieving SMS messages..."):
                     twilio_service = TwilioMessageService()
-                    messages_df = twilio_service.get_messages_for_number(
-                        st.session_state.customer_phone, 
-                        days_back
+                    # Twilio pages flow straight into the PDF temp file; only a bounded preview stays in memory
+                    # All of the customer's numbers are fetched concurrently and merged by SID
+                    # The PDF is written in the store's spill directory, which the store cleans up
+                    fetch_errors = []
+                    pdf_path, total, preview_df, fetch_errors = twilio_service.write_messages_pdf(
+                        ', '.join(customer_phones),
+                        twilio_service.iter_messages_for_numbers(
+                            customer_phones,
+                            days_back,
+                            errors=fetch_errors
+                        ),
+                        errors=fetch_errors,
+                        directory=artifact_store.spill_dir
                     )
                     
-                    if not messages_df.empty:
-                        st.session_state.messages_df = messages_df
-                        
-                        # Generate PDF
-                        pdf_bytes = twilio_service.create_messages_pdf(
-                            st.session_state.customer_phone,
-                            messages_df
+                    if total:
+                        artifact_suffix = f"{','.join(customer_phones)}:{days_back}"
+                        st.session_state.messages_key = artifact_store.put(
+                            f"messages:{artifact_suffix}",
+                            {'preview_df': preview_df, 'total': total, 'errors': fetch_errors}
+                        )
+                        st.session_state.messages_pdf_key = artifact_store.put_file(
+                            f"messages_pdf:{artifact_suffix}",
+                            pdf_path
                         )
-                        st.session_state.messages_pdf = pdf_bytes
+                        st.session_state.pop('messages_summary_key', None)
                         
-                        st.success(f"Found {len(messages_df)} messages")
+                        if fetch_errors:
+                            st.warning(f"Found {total} messages, but the report is incomplete")
+                        else:
+                            st.success(f"Found {total} messages")
                     else:
-                        st.warning("No messages found for this phone number")
+                        os.remove(pdf_path)
+                        if fetch_errors:
+                            st.error(f"SMS retrieval failed: {'; '.join(fetch_errors)}")
+                        else:
+                            st.warning("No messages found for this phone number")
         
-        # Display messages if available
-        if hasattr(st.session_state, 'messages_df') and not st.session_state.messages_df.empty:
+        # Display messages if available (they may have been evicted from the artifact store)
+        messages = session_artifact('messages')
+        if messages is not None and not messages['preview_df'].empty:
+            messages_df = messages['preview_df']
+            if messages.get('errors'):
+                st.warning(
+                    "This SMS report is incomplete because message retrieval failed: "
+                    f"{'; '.join(messages['errors'])}. Regenerate it before using it as evidence."
+                )
             st.write("**Messages Preview:**")
-            st.dataframe(st.session_state.messages_df, use_container_width=True)
+            if messages['total'] > len(messages_df):
+                st.caption(
+                    f"Showing the {len(messages_df)} most recent of "
+                    f"{messages['total']} messages; the PDF contains all of them."
+                )
+            st.dataframe(messages_df, use_container_width=True)
             
             # Add AI summarization controls
             col_ai1, col_ai2 = st.columns([1, 1])
@@ -270,32 +435,142 @@ Travelers register with STAMP and accept our Terms & Conditions, which explain t
                         with st.spinner("Summarizing messages with Gemini..."):
                             try:
                                 summary = st.session_state.gemini_service.summarize_messages(
-                                    st.session_state.messages_df
+                                    messages_df
+                                )
+                                st.session_state.messages_summary_key = artifact_store.put(
+                                    st.session_state.messages_key.replace("messages:", "messages_summary:", 1),
+                                    summary
                                 )
-                                st.session_state.messages_summary = summary
                                 st.success("Summary generated.")
                             except Exception as e:
                                 st.error(f"AI summary error: {e}")
             
             with col_ai2:
                 # Download button for PDF
-                if hasattr(st.session_state, 'messages_pdf'):
+                pdf_key = st.session_state.get('messages_pdf_key')
+                if pdf_key and artifact_store.get_path(pdf_key):
+                    # Deferred: the file is only read when the agent actually clicks download
                     st.download_button(
                         label="📥 Download SMS Report PDF",
-                        data=st.session_state.messages_pdf,
-                        file_name=f"sms_report_{st.session_state.customer_phone.replace('+', '')}.pdf",
+                        data=lambda: read_artifact_file(pdf_key),
+                        file_name=f"sms_report_{'_'.join(p.replace('+', '') for p in customer_phones)}.pdf",
                         mime="application/pdf",
                         use_container_width=True
                     )
+                elif pdf_key:
+                    st.warning("The SMS report PDF has expired. Generate it again to download or attach it.")
             
             # Show AI summary if present
-            if hasattr(st.session_state, "messages_summary"):
+            messages_summary = session_artifact('messages_summary')
+            if messages_summary is not None:
                 st.write("**AI SMS Summary**")
                 st.text_area(
                     "AI SMS Summary",  # non-empty label prevents Streamlit warning
-                    value=st.session_state.messages_summary,
+                    value=messages_summary,
                     height=220,
                     label_visibility="collapsed"
                 )
-    else:
-        st.info("Customer phone number not found. Please ensure invoice data is loaded.")
\ No newline at end of file
+    elif not skipped_phones:
+        st.info("Customer phone number not found. Please ensure invoice data is loaded.")
+
+    # Stripe Submission Section
+    st.subheader("📤 Submit to Stripe")
+    
+    evidence_files = {}
+    pdf_key = st.session_state.get('messages_pdf_key')
+    # An expired report is not attached; the Documents section asks for it to be regenerated
+    if pdf_key and artifact_store.get_path(pdf_key):
+        evidence_files['customer_communication'] = pdf_key
+    st.write(
+        f"**Evidence files:** {', '.join(evidence_files) if evidence_files else 'none (generate the SMS report to attach it)'}"
+    )
+    
+    if st.button("➕ Add to submission batch", use_container_width=True):
+        # Only strings and artifact keys are queued; files are resolved when the batch runs
+        batch = st.session_state.setdefault('submission_batch', {})
+        previous = batch.get(st.session_state.dispute_id, {})
+        batch[st.session_state.dispute_id] = {
+            'dispute_id': st.session_state.dispute_id,
+            'selected_option': selected_option,
+            'product_type': selected_product_type,
+            'description': product_description,
+            'customer_name': customer_name,
+            'service_date': issued_date,
+            'file_keys': evidence_files,
+            # Kept when re-adding, so unchanged content does not go back to a key with a stored failure
+            'retry_generation': previous.get('retry_generation', 0),
+        }
+        st.success(f"Dispute {st.session_state.dispute_id} added to the submission batch")
+
+# Submission batch - submits every queued dispute concurrently
+if st.session_state.get('submission_batch'):
+    batch = st.session_state.submission_batch
+    st.subheader(f"📦 Submission batch ({len(batch)})")
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Dispute ID': item['dispute_id'],
+                'Response': item['selected_option'],
+                'Files': ', '.join(item['file_keys']) or '-',
+            }
+            for item in batch.values()
+        ]),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    final_submit = st.checkbox(
+        "Submit evidence (final)",
+        value=False,
+        help="When unchecked the evidence is only saved on the dispute so it can still be edited in Stripe"
+    )
+    col_submit, col_clear = st.columns([1, 1])
+    
+    with col_submit:
+        if st.button("🚀 Send batch to Stripe", use_container_width=True):
+            try:
+                stripe_service = StripeEvidenceService()
+            except Exception as e:
+                st.error(f"Stripe setup error: {e}")
+                stripe_service = None
+            
+            if stripe_service is not None:
+                ready, missing = [], []
+                for item in batch.values():
+                    paths = {field: artifact_store.get_path(key) for field, key in item['file_keys'].items()}
+                    if all(paths.values()):
+                        ready.append({**item, 'files': paths})
+                    else:
+                        missing.append({
+                            'dispute_id': item['dispute_id'],
+                            'status': 'failed',
+                            'error': 'Evidence file expired from the artifact store; regenerate the SMS report',
+                        })
+                
+                with st.spinner(f"Sending {len(ready)} disputes to Stripe..."):
+                    results = stripe_service.submit_batch(ready, submit=final_submit)
+                results = pd.concat([results, pd.DataFrame(missing)], ignore_index=True)
+                st.session_state.submission_results = results
+                
+                # Keep failed disputes queued so they can be retried
+                for dispute_id in results.loc[results['status'] != 'failed', 'dispute_id']:
+                    batch.pop(dispute_id, None)
+                # A failure Stripe stored under the key would be replayed; resend under a new one
+                if 'retry_with_new_key' in results.columns:
+                    for dispute_id in results.loc[results['retry_with_new_key'] == True, 'dispute_id']:
+                        if dispute_id in batch:
+                            batch[dispute_id]['retry_generation'] = batch[dispute_id].get('retry_generation', 0) + 1
+                st.rerun()
+    
+    with col_clear:
+        if st.button("🗑️ Clear batch", use_container_width=True):
+            st.session_state.submission_batch = {}
+            st.rerun()
+
+if st.session_state.get('submission_results') is not None:
+    results = st.session_state.submission_results
+    st.subheader("Stripe submission results")
+    st.caption(
+        f"{(results['status'] != 'failed').sum()} succeeded · {(results['status'] == 'failed').sum()} failed"
+    )
+    st.dataframe(results, use_container_width=True, hide_index=True)
@@ -0,0 +1,357 @@
+"""
+Concurrent-session load test for app.py.
+
+Starts one `streamlit run` server for app.py (bench/app_server.py, with the fakes for
+Azure SQL, Twilio and Gemini from bench/fakes.py installed in it) and drives it with many
+simulated agents, each a thread speaking Streamlit's websocket protocol the way a browser
+tab does. All sessions share the server's process-wide state: the SQL connection, the
+dispute prefetcher, the artifact store and the local replica.
+Each session loops over: initial load, dispute lookup, response option change,
+SMS report and Gemini summary. Reports per-action latency percentiles, throughput,
+errors, the server's SQL and artifact store counters, and the server's RSS over time.
+The server runs from a temporary directory, so its logs and spill files stay out of the repo.
+
+    python -m bench.app_load_test --sessions 30 --iterations 3
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+from bench.fakes import make_dataset
+
+SERVER_PATH = os.path.join(ROOT, "bench", "app_server.py")
+ACTIONS = ["initial_load", "lookup", "option_change", "sms_report", "summary"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_rss_bytes(pid: int):
+    """Current RSS of another process; None where there is no /proc"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        # Not `_stop`: Thread.join() calls its own private _stop() method
+        self._stop_event = threading.Event()
+
+    def run(self):
+        started = time.perf_counter()
+        while not self._stop_event.is_set():
+            rss = process_rss_bytes(self.pid)
+            if rss is not None:
+                self.samples.append((time.perf_counter() - started, rss))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Session:
+    """One agent's browser tab: keeps its widget values and sends them with every rerun"""
+
+    def __init__(self, index: int, args, url: str, dispute_ids: list):
+        self.index = index
+        self.args = args
+        self.url = url
+        self.dispute_ids = dispute_ids
+        self.rng = random.Random(index)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.failures = []
+        self.websocket = None
+        # Label -> widget element from the last run, and label -> (WidgetState field, value)
+        self.widgets = {}
+        self.values = {}
+
+    def _widget_states(self, clicked: str = None) -> list:
+        states = []
+        for label, (field, value) in self.values.items():
+            if label in self.widgets:
+                states.append(WidgetState(id=self.widgets[label].id, **{field: value}))
+        if clicked is not None:
+            states.append(WidgetState(id=self.widgets[clicked].id, trigger_value=True))
+        return states
+
+    def _rerun(self, clicked: str = None) -> int:
+        """Send a rerun and read deltas until the script finishes; returns the exceptions rendered"""
+        back_msg = BackMsg()
+        back_msg.rerun_script.widget_states.widgets.extend(self._widget_states(clicked))
+        self.websocket.send(back_msg.SerializeToString())
+
+        widgets, exceptions = {}, 0
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(self.websocket.recv(timeout=self.args.timeout))
+            kind = msg.WhichOneof("type")
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element_type = msg.delta.new_element.WhichOneof("type")
+                element = getattr(msg.delta.new_element, element_type)
+                if element_type == "exception":
+                    exceptions += 1
+                    self.failures.append(f"session {self.index}: {element.type}: {element.message}")
+                elif getattr(element, "id", "") and hasattr(element, "label"):
+                    widgets[element.label] = element
+            elif kind == "new_session":
+                # Also sent when st.rerun() replaces a run, so only the last run's widgets count
+                widgets = {}
+            elif kind == "script_finished" and msg.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY:
+                self.widgets = widgets
+                return exceptions
+
+    def _timed(self, action: str, clicked: str = None):
+        started = time.perf_counter()
+        try:
+            if self._rerun(clicked):
+                self.errors[action] += 1
+        except Exception as e:
+            # e.g. the run timing out or the server dropping the connection
+            self.failures.append(f"session {self.index} {action}: {e!r}")
+            self.errors[action] += 1
+        self.latencies[action].append(time.perf_counter() - started)
+
+    def _think(self):
+        if self.args.think_time:
+            time.sleep(self.rng.uniform(0, self.args.think_time))
+
+    def run(self):
+        with connect(self.url, subprotocols=["streamlit"], max_size=None, open_timeout=self.args.timeout) as websocket:
+            self.websocket = websocket
+            self._timed("initial_load")
+
+            for _ in range(self.args.iterations):
+                self._think()
+                self.values["Dispute ID"] = ("string_value", self.rng.choice(self.dispute_ids))
+                self._timed("lookup", clicked="Get Data")
+
+                selectbox = self.widgets.get("Select your response:")
+                if selectbox is not None:
+                    self._think()
+                    self.values[selectbox.label] = ("string_value", self.rng.choice(selectbox.options[1:]))
+                    self._timed("option_change")
+
+                if "Generate SMS Report" not in self.widgets:
+                    continue
+                self._think()
+                self._timed("sms_report", clicked="Generate SMS Report")
+
+                if "🧠 Summarize SMS Messages (Gemini)" in self.widgets:
+                    self._think()
+                    self._timed("summary", clicked="🧠 Summarize SMS Messages (Gemini)")
+        return self
+
+
+def run_session(session: Session, start: threading.Event) -> Session:
+    start.wait()
+    try:
+        session.run()
+    except Exception as e:
+        # The session could not carry on, e.g. the websocket never connected
+        session.failures.append(f"session {session.index}: {e!r}")
+        session.errors["session"] += 1
+    return session
+
+
+def start_server(args, workdir: str, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, SERVER_PATH,
+        "--port", str(port),
+        "--stats-file", os.path.join(workdir, "stats.json"),
+        "--disputes", str(args.disputes),
+        "--messages", str(args.messages),
+        "--sql-latency", str(args.sql_latency),
+        "--twilio-page-latency", str(args.twilio_page_latency),
+        "--gemini-latency", str(args.gemini_latency),
+    ]
+    if args.parallel_sql:
+        command.append("--parallel-sql")
+    replica_path = os.path.join(workdir, "replica.db") if args.replica else ""
+    if args.replica:
+        command += ["--replica-path", replica_path]
+    # The app reads LOCAL_REPLICA_PATH from the secrets.toml next to the server's cwd
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f"LOCAL_REPLICA_PATH = {json.dumps(replica_path)}\n")
+    env = dict(os.environ, ARTIFACT_STORE_DIR=os.path.join(workdir, "artifacts"))
+    with open(os.path.join(workdir, "server.log"), "w") as log:
+        server = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.5)
+    stop_server(server)
+    with open(os.path.join(workdir, "server.log")) as f:
+        sys.exit(f"server did not start (exit code {server.returncode}):\n{f.read()[-2000:]}")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def read_stats(workdir: str) -> dict:
+    try:
+        with open(os.path.join(workdir, "stats.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def percentile(values: list, q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=30, help="concurrent simulated agents")
+    parser.add_argument("--iterations", type=int, default=3, help="disputes worked per session")
+    parser.add_argument("--disputes", type=int, default=200, help="size of the fake dispute table")
+    parser.add_argument("--messages", type=int, default=300, help="fake SMS messages per phone number")
+    parser.add_argument("--sql-latency", type=float, default=0.05, help="seconds per fake SQL round trip")
+    parser.add_argument("--twilio-page-latency", type=float, default=0.15, help="seconds per fake Twilio page")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="seconds per fake Gemini call")
+    parser.add_argument("--parallel-sql", action="store_true", help="let fake SQL queries overlap instead of serializing on one connection")
+    parser.add_argument("--replica", action="store_true", help="serve lookups from a local SQLite replica synced from the fake")
+    parser.add_argument("--think-time", type=float, default=0.5, help="max random pause between actions")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for one script run")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="seconds to wait for the server to start")
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--json", help="also write the raw results to this file")
+    args = parser.parse_args()
+
+    dispute_ids = [row["ExternalPaymentDisputeId"] for row in make_dataset(args.disputes)["disputes"]]
+
+    with tempfile.TemporaryDirectory(prefix="app_load_test_") as workdir:
+        port = free_port()
+        server = start_server(args, workdir, port)
+        try:
+            idle_rss = process_rss_bytes(server.pid)
+            url = f"ws://127.0.0.1:{port}/_stcore/stream"
+            sessions = [Session(index, args, url, dispute_ids) for index in range(args.sessions)]
+            start = threading.Event()
+            sampler = RssSampler(server.pid, args.rss_interval)
+            with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+                futures = [pool.submit(run_session, session, start) for session in sessions]
+                sampler.start()
+                started = time.perf_counter()
+                start.set()
+                for future in futures:
+                    future.result()
+                wall = time.perf_counter() - started
+            sampler.stop()
+            # Give the server time to write its counters once more after the last run
+            time.sleep(2)
+            stats = read_stats(workdir)
+            server_exit = server.poll()
+        finally:
+            stop_server(server)
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    failures = []
+    for session in sessions:
+        for action, values in session.latencies.items():
+            latencies[action].extend(values)
+        for action, count in session.errors.items():
+            errors[action] += count
+        failures.extend(session.failures)
+    total_actions = sum(len(v) for v in latencies.values())
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations on one server in {wall:.1f}s "
+          f"({total_actions / wall:.2f} actions/s, SQL {'parallel' if args.parallel_sql else 'serialized'}"
+          f"{', local replica' if args.replica else ''})")
+    print(f"{'action':<14} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for action in ACTIONS:
+        values = latencies[action]
+        if not values:
+            continue
+        print(
+            f"{action:<14} {len(values):>6} {errors[action]:>6} "
+            f"{percentile(values, 50) * 1000:>9.0f} {percentile(values, 90) * 1000:>9.0f} "
+            f"{percentile(values, 99) * 1000:>9.0f} {max(values) * 1000:>9.0f}"
+        )
+    print(f"sessions aborted mid-run: {errors['session']}"
+          f"{'' if server_exit is None else f', server exited with code {server_exit} during the run'}")
+    for failure in failures[:10]:
+        print(f"  {failure}")
+
+    waits = stats.get("sql_wait_seconds", [])
+    print(f"\nSQL: {stats.get('sql_queries', 0)} queries, connection wait p50 {percentile(waits, 50) * 1000:.0f} ms, "
+          f"p99 {percentile(waits, 99) * 1000:.0f} ms, total {sum(waits):.1f}s")
+    store = stats.get("artifact_store")
+    if store:
+        print(f"artifact store: {store['entries']} entries, {store['memory_bytes'] / 2**20:.1f} MB in memory, "
+              f"{store['disk_bytes'] / 2**20:.1f} MB on disk, {store['hits']} hits, {store['misses']} misses, "
+              f"{store['evictions']} evictions")
+
+    # One process serves every session, so its RSS growth is what the sessions cost together
+    if idle_rss is None:
+        print("\nRSS not sampled: reading the server's memory needs /proc")
+    elif sampler.samples:
+        peak = max(rss for _, rss in sampler.samples)
+        print(f"\nserver RSS: {idle_rss / 2**20:.1f} MB before the first session, {peak / 2**20:.1f} MB peak, "
+              f"{(peak - idle_rss) / args.sessions / 2**20:.2f} MB growth per session")
+        step = max(1, len(sampler.samples) // 20)
+        for elapsed, rss in sampler.samples[::step]:
+            print(f"  {elapsed:>7.1f}s {rss / 2**20:>8.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "wall_seconds": wall,
+                "throughput_actions_per_second": total_actions / wall,
+                "latencies_seconds": latencies,
+                "errors": errors,
+                "failures": failures,
+                "server_stats": stats,
+                "idle_rss_bytes": idle_rss,
+                "rss_samples": sampler.samples,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
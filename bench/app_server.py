@@ -0,0 +1,99 @@
+"""
+Runs app.py under `streamlit run` with the fakes from bench/fakes.py installed in the
+server process, for bench/app_load_test.py to drive over its websocket.
+While it runs, the server's SQL and artifact store counters are written to --stats-file
+every --stats-interval seconds.
+
+    python bench/app_server.py --port 8599 --stats-file stats.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.web import cli as stcli
+
+import db.data_loader
+import db.replica
+import services.ai_service
+import services.twilio_service
+from bench.fakes import FakeAzureConnection, FakeTwilioClient, fake_genai_module, make_dataset
+from utils.artifact_store import get_artifact_store
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+
+def install_fakes(args) -> FakeAzureConnection:
+    """Patch the app's external dependencies; the script reuses the already imported modules"""
+    connection = FakeAzureConnection(
+        make_dataset(args.disputes),
+        latency=args.sql_latency,
+        serialize=not args.parallel_sql
+    )
+    db.data_loader.get_db_connection = lambda: connection
+    db.replica.get_db_connection = lambda: connection
+    services.twilio_service.Client = lambda *a, **kw: FakeTwilioClient(args.messages, args.twilio_page_latency)
+    services.ai_service.genai = fake_genai_module(args.gemini_latency)
+    os.environ.setdefault("GEMINI_API_KEY", "load-test")
+    return connection
+
+
+def write_stats(path: str, interval: float, connection: FakeAzureConnection):
+    while True:
+        with connection._stats_lock:
+            waits = list(connection.wait_times)
+        stats = {
+            "sql_queries": len(waits),
+            "sql_wait_seconds": waits,
+            # The same cache_resource singleton every session's script gets
+            "artifact_store": get_artifact_store().metrics(),
+        }
+        with open(path + ".tmp", "w") as f:
+            json.dump(stats, f)
+        os.replace(path + ".tmp", path)
+        threading.Event().wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--stats-file", required=True)
+    parser.add_argument("--stats-interval", type=float, default=1.0)
+    parser.add_argument("--disputes", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--sql-latency", type=float, default=0.05)
+    parser.add_argument("--twilio-page-latency", type=float, default=0.15)
+    parser.add_argument("--gemini-latency", type=float, default=1.0)
+    parser.add_argument("--parallel-sql", action="store_true")
+    parser.add_argument("--replica-path", help="sync a local SQLite replica here before serving; "
+                        "the app uses it when LOCAL_REPLICA_PATH in .streamlit/secrets.toml points here")
+    args = parser.parse_args()
+
+    connection = install_fakes(args)
+    if args.replica_path:
+        # Synced up front so every lookup is served locally from the first session on
+        db.replica.LocalReplica(args.replica_path).sync()
+    threading.Thread(
+        target=write_stats,
+        args=(args.stats_file, args.stats_interval, connection),
+        name="load-test-stats",
+        daemon=True
+    ).start()
+
+    sys.argv = [
+        "streamlit", "run", APP_PATH,
+        "--server.port", str(args.port),
+        "--server.address", "127.0.0.1",
+        "--server.headless", "true",
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Minimal local stand-in for the parts of the Stripe API used by services/stripe_service.py:
+POST /v1/files and POST /v1/disputes/{id}. It honours Idempotency-Key like Stripe does
+(the first response of a request that ran, success or 500, is cached and replayed) and can
+inject latency and three kinds of failure:
+
+- failure_rate: rejected before running, a 429 or a 503 with Stripe-Should-Retry: true; not cached
+- server_error_rate: a 500 while running, cached under the key with Stripe-Should-Retry: false
+- lost_response_rate: the request is applied but the connection drops before the response,
+  which the client sees as an APIConnectionError; only idempotency makes resending it safe
+
+    python -m bench.fake_stripe --port 12111
+    STRIPE_API_BASE=http://localhost:12111 STRIPE_API_KEY=sk_test_local streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class FakeStripeState:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, server_error_rate: float = 0.0,
+                 lost_response_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.server_error_rate = server_error_rate
+        self.lost_response_rate = lost_response_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.idempotent_responses = {}
+        self.disputes = {}
+        self.files = {}
+        self.applied = defaultdict(int)
+        self.replays = 0
+        self.injected_failures = 0
+        self.server_errors = 0
+        self.lost_responses = 0
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.rng.random() < rate
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    state: FakeStripeState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None, replayed: bool = False):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if replayed:
+            self.send_header("Idempotent-Replayed", "true")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    @staticmethod
+    def _error_body(message: str, error_type: str = "api_error") -> dict:
+        return {"error": {"type": error_type, "message": message}}
+
+    def do_POST(self):
+        state = self.state
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(state.latency)
+
+        if state.roll(state.failure_rate):
+            with state.lock:
+                state.injected_failures += 1
+                status = state.rng.choice([429, 503])
+            if status == 429:
+                return self._send(429, self._error_body("Injected rate limit", "rate_limit_error"))
+            return self._send(503, self._error_body("Injected unavailable"), {"Stripe-Should-Retry": "true"})
+
+        key = self.headers.get("Idempotency-Key")
+        with state.lock:
+            cached = state.idempotent_responses.get(key) if key else None
+            if cached is not None:
+                state.replays += 1
+        if cached is not None:
+            return self._send(*cached, replayed=True)
+
+        headers = {}
+        if state.roll(state.server_error_rate):
+            # Failed while running: Stripe stores the 500 under the key, so retrying cannot help
+            with state.lock:
+                state.server_errors += 1
+            status, response = 500, self._error_body("Injected server error")
+            headers = {"Stripe-Should-Retry": "false"}
+        elif self.path == "/v1/files":
+            status, response = self._create_file(body)
+        elif self.path.startswith("/v1/disputes/"):
+            status, response = self._update_dispute(self.path.rsplit("/", 1)[-1], body)
+        else:
+            return self._send(404, self._error_body(f"Unrecognized request URL (POST: {self.path})", "invalid_request_error"))
+
+        with state.lock:
+            if key:
+                state.idempotent_responses[key] = (status, response, headers)
+        if state.roll(state.lost_response_rate):
+            with state.lock:
+                state.lost_responses += 1
+            # Drop the connection without a response, as a network failure would
+            self.close_connection = True
+            return
+        self._send(status, response, headers)
+
+    def _create_file(self, body: bytes):
+        file_id = f"file_{uuid.uuid4().hex[:24]}"
+        with self.state.lock:
+            self.state.files[file_id] = len(body)
+            self.state.applied["files"] += 1
+        return 200, {
+            "id": file_id,
+            "object": "file",
+            "purpose": "dispute_evidence",
+            "size": len(body),
+            "type": "pdf",
+            "created": int(time.time()),
+        }
+
+    def _update_dispute(self, dispute_id: str, body: bytes):
+        params = dict(parse_qsl(body.decode()))
+        evidence = {k[len("evidence["):-1]: v for k, v in params.items() if k.startswith("evidence[")}
+        submitted = params.get("submit") == "true"
+        with self.state.lock:
+            dispute = self.state.disputes.setdefault(dispute_id, {
+                "id": dispute_id,
+                "object": "dispute",
+                "status": "needs_response",
+                "evidence": {},
+                "evidence_details": {"submission_count": 0},
+            })
+            dispute["evidence"].update(evidence)
+            if submitted:
+                dispute["status"] = "under_review"
+                dispute["evidence_details"]["submission_count"] += 1
+            self.state.applied[f"dispute:{dispute_id}"] += 1
+            return 200, json.loads(json.dumps(dispute))
+
+
+def start_fake_stripe(port: int = 0, **state_kwargs):
+    """Serve the fake API on a background thread; returns (server, base_url, state)"""
+    state = FakeStripeState(**state_kwargs)
+    handler = type("BoundFakeStripeHandler", (FakeStripeHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="fake-stripe", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--lost-response-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base_url, _ = start_fake_stripe(
+        args.port,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        server_error_rate=args.server_error_rate,
+        lost_response_rate=args.lost_response_rate
+    )
+    print(f"Fake Stripe API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,231 @@
+"""
+In-process stand-ins for Azure SQL, Twilio and Gemini used by the benchmarks.
+Each fake sleeps for a configurable latency so the app's waiting behaviour is realistic.
+"""
+import re
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+
+DISPUTE_REASONS = ["fraudulent", "general", "credit_not_processed", "duplicate"]
+MODIFIED_BASE = datetime(2024, 1, 1)
+# Table name -> dataset section, for the replica's sync and reconcile queries
+DATASET_TABLES = {
+    "StripeChargeDisputes": "disputes",
+    "RP_Invoices": "invoices",
+    "CustomerAuthenticationAccounts": "phones",
+}
+
+
+def make_dataset(disputes: int = 200, multi_number_every: int = 3) -> dict:
+    """
+    Synthetic rows for the three tables the app reads; every Nth customer has two numbers.
+    Every row carries the ModifiedOn column the local replica syncs on.
+    """
+    dispute_rows, invoice_rows, phone_rows = [], [], []
+    for i in range(disputes):
+        dispute_id = f"dp_{i:05d}"
+        invoice_id = f"inv_{i:05d}"
+        customer_id = f"cus_{i:05d}"
+        dispute_rows.append({
+            "ExternalPaymentDisputeId": dispute_id,
+            "ExternalPaymentDisputeReason": DISPUTE_REASONS[i % len(DISPUTE_REASONS)],
+            "ExternalPaymentDisputeStatus": "needs_response",
+            "ServiceId": invoice_id,
+            "EvidenceDueBy": (datetime(2024, 3, 1) + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "ModifiedOn": MODIFIED_BASE + timedelta(seconds=i),
+        })
+        invoice_rows.append({
+            "InvoiceId": invoice_id,
+            "CustomerId": customer_id,
+            "CustomerFullName": f"Customer {i}",
+            "CompanyName": f"Store {i % 17}",
+            "IssuedOn": "Jan 15 2024 12:00PM",
+            "ModifiedOn": MODIFIED_BASE + timedelta(seconds=i),
+        })
+        phone_rows.append({
+            "Id": len(phone_rows) + 1,
+            "CustomerId": customer_id,
+            "PhoneNumber": f"+3460{i:07d}",
+            "ModifiedOn": MODIFIED_BASE + timedelta(seconds=i),
+        })
+        if multi_number_every and i % multi_number_every == 0:
+            phone_rows.append({
+                "Id": len(phone_rows) + 1,
+                "CustomerId": customer_id,
+                "PhoneNumber": f"0044 7700 {i:06d}",
+                "ModifiedOn": MODIFIED_BASE + timedelta(seconds=i),
+            })
+    return {"disputes": dispute_rows, "invoices": invoice_rows, "phones": phone_rows}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._rows = []
+
+    def execute(self, query: str, params=None):
+        params = list(params or [])
+        columns, rows = self.connection.resolve(query, params)
+        self.description = [(column,) for column in columns]
+        self._rows = [tuple(row[column] for column in columns) for row in rows]
+        return self
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size: int):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeAzureConnection:
+    """
+    Answers the app's queries by matching on the table they read.
+    With serialize=True it behaves like one ODBC connection shared by every session:
+    a query holds the connection for its whole round trip, and time spent waiting is recorded.
+    """
+
+    def __init__(self, dataset: dict, latency: float = 0.05, serialize: bool = True):
+        self.dataset = dataset
+        self.latency = latency
+        self.serialize = serialize
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.wait_times = []
+        self.queries = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def resolve(self, query: str, params: list):
+        started = time.perf_counter()
+        if self.serialize:
+            with self._lock:
+                waited = time.perf_counter() - started
+                time.sleep(self.latency)
+                result = self._answer(query, params)
+        else:
+            waited = 0.0
+            time.sleep(self.latency)
+            result = self._answer(query, params)
+        with self._stats_lock:
+            self.wait_times.append(waited)
+            self.queries += 1
+        return result
+
+    def _answer(self, query: str, params: list):
+        data = self.dataset
+        if "_modified" in query:
+            return self._answer_sync(query, params)
+        if "WHERE" not in query:
+            return self._answer_keys(query)
+        if "COUNT(*)" in query:
+            return ["Total"], [{"Total": len(data["disputes"])}]
+        if "StripeChargeDisputes" in query and "TOP (?)" in query:
+            limit, after = params[0], params[1:]
+            rows = [
+                dict(row, EvidenceDueByCursor=datetime.fromisoformat(row["EvidenceDueBy"]))
+                for row in data["disputes"]
+            ]
+            rows.sort(key=lambda row: (row["EvidenceDueByCursor"], row["ExternalPaymentDisputeId"]))
+            if after:
+                due_by, _, dispute_id = after
+                rows = [row for row in rows if (row["EvidenceDueByCursor"], row["ExternalPaymentDisputeId"]) > (due_by, dispute_id)]
+            columns = ["ExternalPaymentDisputeId", "ExternalPaymentDisputeReason", "ServiceId", "EvidenceDueBy", "EvidenceDueByCursor"]
+            return columns, rows[:limit]
+        if "StripeChargeDisputes" in query:
+            rows = [row for row in data["disputes"] if row["ExternalPaymentDisputeId"] == params[0]]
+            return self._columns(data["disputes"]), rows
+        if "RP_Invoices" in query:
+            rows = [row for row in data["invoices"] if row["InvoiceId"] == params[0]]
+            return self._columns(data["invoices"]), rows
+        if "CustomerAuthenticationAccounts" in query:
+            rows = [row for row in data["phones"] if row["CustomerId"] == params[0]]
+            return ["PhoneNumber"], rows
+        raise ValueError(f"FakeAzureConnection cannot answer query: {query.strip()[:80]}")
+
+    @staticmethod
+    def _columns(rows: list) -> list:
+        # The app's lookups select every synthetic column except the sync bookkeeping one
+        return [column for column in rows[0] if column != "ModifiedOn"]
+
+    @staticmethod
+    def _aliases(query: str) -> list:
+        # "<expr> AS <name>," pairs of a SELECT list; skips the AS inside CAST(... AS VARCHAR(23))
+        return re.findall(r"\bAS (\w+)\s*(?:,|FROM\b)", query)
+
+    def _table_rows(self, query: str) -> list:
+        table = re.search(r"\bFROM (\w+)", query).group(1)
+        return self.dataset[DATASET_TABLES[table]]
+
+    def _answer_sync(self, query: str, params: list):
+        """Incremental replica sync: rows modified at or after the watermark, oldest first"""
+        rows = sorted(self._table_rows(query), key=lambda row: row["ModifiedOn"])
+        if params:
+            rows = [row for row in rows if row["ModifiedOn"] >= params[0]]
+        return self._aliases(query), [dict(row, _modified=row["ModifiedOn"]) for row in rows]
+
+    def _answer_keys(self, query: str):
+        """Replica reconcile: every key currently in the table"""
+        columns = [name.strip() for name in re.search(r"SELECT (.+?) FROM", query).group(1).split(",")]
+        return columns, self._table_rows(query)
+
+
+class FakeMessage:
+    def __init__(self, phone_number: str, i: int):
+        self.sid = f"SM{abs(hash(phone_number)) % 10**8:08d}{i:024x}"
+        self.status = "delivered"
+        self.date_sent = datetime(2024, 1, 1) + timedelta(minutes=i)
+        self.body = f"Message {i}: your STAMP tax free form is ready for customs validation. " * 3
+
+
+class FakeMessages:
+    """Mimics client.messages: list() materializes, stream() fetches lazily page by page"""
+
+    def __init__(self, messages_per_number: int, page_latency: float = 0.0):
+        self.messages_per_number = messages_per_number
+        self.page_latency = page_latency
+
+    def stream(self, to: str = "", page_size: int = 50, **kwargs):
+        # Newest first, like the Twilio API
+        for end in range(self.messages_per_number, 0, -page_size):
+            time.sleep(self.page_latency)
+            for i in range(end - 1, max(end - page_size, 0) - 1, -1):
+                yield FakeMessage(to, i)
+
+    def list(self, **kwargs):
+        return list(self.stream(**kwargs))
+
+
+class FakeTwilioClient:
+    def __init__(self, messages_per_number: int = 300, page_latency: float = 0.0):
+        self.messages = FakeMessages(messages_per_number, page_latency)
+
+
+class FakeGenerativeModel:
+    def __init__(self, latency: float = 1.0):
+        self.latency = latency
+
+    def generate_content(self, prompt: str):
+        time.sleep(self.latency)
+        part = types.SimpleNamespace(text=f"Summary of {prompt.count(chr(10))} prompt lines.")
+        content = types.SimpleNamespace(parts=[part])
+        return types.SimpleNamespace(candidates=[types.SimpleNamespace(content=content)])
+
+
+def fake_genai_module(latency: float = 1.0):
+    """Drop-in for the `google.generativeai` module object used by services.ai_service"""
+    return types.SimpleNamespace(
+        configure=lambda **kwargs: None,
+        GenerativeModel=lambda name: FakeGenerativeModel(latency),
+    )
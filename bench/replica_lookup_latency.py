@@ -0,0 +1,81 @@
+"""
+Dispute lookup latency with and without the local SQLite replica.
+
+Times load_dispute_bundle (dispute, invoice and phone numbers) against the fake Azure SQL
+connection in three modes: no replica, a freshly synced replica, and a replica past its
+freshness threshold, which must fall back to Azure for every lookup. The dispute row
+always comes from Azure, so a fresh replica saves the invoice and phone queries only.
+
+    python -m bench.replica_lookup_latency --lookups 500 --sql-latency 0.05 --concurrency 8
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db.data_loader
+import db.replica
+from bench.fakes import FakeAzureConnection, make_dataset
+
+
+def percentile(values: list, q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def time_lookups(dispute_ids: list, concurrency: int) -> list:
+    def lookup(dispute_id):
+        started = time.perf_counter()
+        db.data_loader.load_dispute_bundle(dispute_id)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lookup, dispute_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--disputes", type=int, default=2000, help="size of the fake dispute table")
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--sql-latency", type=float, default=0.05, help="seconds per fake SQL round trip")
+    parser.add_argument("--concurrency", type=int, default=1, help="lookups running at once")
+    args = parser.parse_args()
+
+    connection = FakeAzureConnection(make_dataset(args.disputes), latency=args.sql_latency)
+    db.data_loader.get_db_connection = lambda: connection
+    db.replica.get_db_connection = lambda: connection
+
+    rng = random.Random(0)
+    all_ids = [row["ExternalPaymentDisputeId"] for row in connection.dataset["disputes"]]
+    dispute_ids = [rng.choice(all_ids) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        replica = db.replica.LocalReplica(os.path.join(workdir, "replica.db"))
+        started = time.perf_counter()
+        replica.sync()
+        print(f"initial sync for {args.disputes} disputes: {time.perf_counter() - started:.2f}s\n")
+        stale = db.replica.LocalReplica(os.path.join(workdir, "replica.db"), max_staleness=0)
+
+        print(f"{'mode':<14} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'lookups/s':>10} {'SQL queries':>12}")
+        for mode, current in (("azure only", None), ("fresh replica", replica), ("stale replica", stale)):
+            db.data_loader.get_local_replica = lambda: current
+            queries_before = connection.queries
+            started = time.perf_counter()
+            latencies = time_lookups(dispute_ids, args.concurrency)
+            wall = time.perf_counter() - started
+            print(
+                f"{mode:<14} {percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 90) * 1000:>9.1f} "
+                f"{percentile(latencies, 99) * 1000:>9.1f} {len(latencies) / wall:>10.1f} "
+                f"{connection.queries - queries_before:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Peak-memory benchmark for the SMS report: in-memory list/DataFrame/BytesIO path
+versus the streaming Twilio-pages-to-PDF-temp-file path.
+
+The streaming path keeps only one Twilio page of messages in memory, but its peak is
+not bounded by page size: reportlab holds the uncompressed content stream of every
+finished PDF page until save(), so the peak still grows with the number of messages.
+The benchmark prints that growth per message and says whether the peak stayed flat.
+
+Runs against a fake Twilio client, so no credentials are needed. Layout is pure Python
+and tracemalloc slows it several times over, so large sizes take minutes:
+
+    python -m bench.sms_report_memory --sizes 250 500 1000 2000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.twilio_service import TwilioMessageService
+from bench.fakes import FakeTwilioClient
+
+
+def make_service(total: int) -> TwilioMessageService:
+    service = TwilioMessageService.__new__(TwilioMessageService)
+    service.client = FakeTwilioClient(messages_per_number=total)
+    return service
+
+
+def run_in_memory(service: TwilioMessageService) -> int:
+    df = service.get_messages_for_number("+15550000000")
+    pdf_bytes = service.create_messages_pdf("+15550000000", df)
+    return len(pdf_bytes)
+
+
+def run_streaming(service: TwilioMessageService) -> int:
+    pdf_path, _, _, _ = service.write_messages_pdf(
+        "+15550000000",
+        service.iter_messages_for_number("+15550000000")
+    )
+    size = os.path.getsize(pdf_path)
+    os.remove(pdf_path)
+    return size
+
+
+def measure(fn, total: int):
+    gc.collect()
+    tracemalloc.start()
+    pdf_size = fn(make_service(total))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, pdf_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--skip-in-memory", action="store_true", help="only measure the streaming path")
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'in-memory peak':>16} {'streaming peak':>16} {'ratio':>7} "
+          f"{'peak/msg':>10} {'pdf size':>10} {'pdf/msg':>9}")
+    streaming = []
+    for total in sorted(args.sizes):
+        stream_peak, pdf_size = measure(run_streaming, total)
+        streaming.append((total, stream_peak))
+        legacy_peak = None if args.skip_in_memory else measure(run_in_memory, total)[0]
+        print(
+            f"{total:>10} "
+            f"{'-' if legacy_peak is None else f'{legacy_peak / 2**20:.1f} MB':>16} "
+            f"{stream_peak / 2**20:>13.2f} MB "
+            f"{'-' if legacy_peak is None else f'{legacy_peak / max(stream_peak, 1):.1f}x':>7} "
+            f"{stream_peak / total / 2**10:>7.2f} KB {pdf_size / 2**10:>7.0f} KB "
+            f"{pdf_size / total / 2**10:>6.2f} KB"
+        )
+
+    if len(streaming) > 1:
+        (first_total, first_peak), (last_total, last_peak) = streaming[0], streaming[-1]
+        growth = (last_peak - first_peak) / (last_total - first_total)
+        # Allow 10% drift between the smallest and largest run before calling it unbounded
+        bounded = last_peak <= first_peak * 1.1
+        print(
+            f"\nstreaming peak grows {growth / 2**10:.2f} KB per extra message "
+            f"({first_peak / 2**20:.2f} MB at {first_total} -> {last_peak / 2**20:.2f} MB at {last_total}): "
+            + ("bounded by page size" if bounded else
+               "NOT bounded by page size; reportlab keeps finished pages in memory until save()")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Runs a batch of evidence submissions through StripeEvidenceService against the local
+Stripe stand-in, with injected failures, then re-runs the same batch to show that
+idempotency keys make it safe: every dispute must be applied exactly once.
+Disputes that hit a stored 500 come back with retry_with_new_key set; like the app, the
+re-run bumps their retry_generation so Stripe sees a new key instead of replaying the 500.
+
+    python -m bench.stripe_submission_batch --disputes 50 --failure-rate 0.1 --server-error-rate 0.02 --lost-response-rate 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_stripe import start_fake_stripe
+from services.stripe_service import StripeEvidenceService
+from utils.pdf_generator import generate_mock_pdf
+
+
+def make_submissions(count: int, workdir: str) -> list:
+    submissions = []
+    for i in range(count):
+        dispute_id = f"dp_{i:05d}"
+        pdf_path = os.path.join(workdir, f"{dispute_id}.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(generate_mock_pdf("Customer communication", f"inv_{i:05d}", dispute_id))
+        submissions.append({
+            "dispute_id": dispute_id,
+            "selected_option": "The cardholder received the product or service",
+            "product_type": "Digital product or service",
+            "description": f"Customer {i} made a one-time purchase using STAMP's service.",
+            "customer_name": f"Customer {i}",
+            "service_date": "2024-01-15",
+            "files": {"customer_communication": pdf_path},
+        })
+    return submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--disputes", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake Stripe request")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="429/503 rejected before running")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="500 stored under the idempotency key")
+    parser.add_argument("--lost-response-rate", type=float, default=0.05, help="applied, then the connection drops")
+    args = parser.parse_args()
+
+    server, base_url, state = start_fake_stripe(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        server_error_rate=args.server_error_rate,
+        lost_response_rate=args.lost_response_rate
+    )
+    service = StripeEvidenceService(
+        api_key="sk_test_local",
+        api_base=base_url,
+        max_workers=args.workers,
+        backoff_seconds=0.05
+    )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        submissions = make_submissions(args.disputes, workdir)
+        for run in ("first run", "re-run"):
+            started = time.perf_counter()
+            report = service.submit_batch(submissions)
+            wall = time.perf_counter() - started
+            print(f"{run}: {len(report)} disputes in {wall:.1f}s, "
+                  f"{(report['status'] == 'submitted').sum()} submitted, "
+                  f"{(report['status'] == 'failed').sum()} failed, "
+                  f"{report['attempts'].sum()} requests")
+            failed = report[report["status"] == "failed"]
+            if not failed.empty:
+                print(failed[["dispute_id", "attempts", "retry_with_new_key", "error"]].to_string(index=False))
+            # Resend disputes whose failure Stripe stored under their key, as the app does
+            by_id = {s["dispute_id"]: s for s in submissions}
+            for dispute_id in failed.loc[failed["retry_with_new_key"], "dispute_id"]:
+                by_id[dispute_id]["retry_generation"] = by_id[dispute_id].get("retry_generation", 0) + 1
+
+    server.shutdown()
+    duplicates = {k: v for k, v in state.applied.items() if k.startswith("dispute:") and v > 1}
+    print(f"\nserver: {state.applied['files']} files stored, {state.replays} idempotent replays, "
+          f"{state.injected_failures} rejected, {state.server_errors} server errors, "
+          f"{state.lost_responses} lost responses, "
+          f"{len(duplicates)} disputes applied more than once")
+
+
+if __name__ == "__main__":
+    main()
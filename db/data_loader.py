@@ -1,8 +1,35 @@
-from db.queries import get_invoice_by_id, get_dispute_by_id, get_customer_phone_by_id
+from db.queries import (
+    get_invoice_by_id,
+    get_dispute_by_id,
+    get_customer_phones_by_id,
+    get_open_disputes_first_page,
+    get_open_disputes_after,
+    get_open_disputes_count,
+)
 from db.connection import get_db_connection
+from db.replica import get_local_replica
+from utils.phone_numbers import normalize_e164
 import pandas as pd
 
+def _replica_lookup(table: str, lookup):
+    """
+    Run a lookup against the local replica if it is configured and synced within its
+    freshness threshold. Returns None when the caller should fall back to Azure.
+    """
+    try:
+        replica = get_local_replica()
+        if replica is not None and replica.is_fresh(table):
+            return lookup(replica)
+    except Exception as e:
+        print(f"Replica unavailable, falling back to Azure: {e}")
+    return None
+
 def get_invoice_data(invoice_id: str) -> pd.DataFrame:
+    # Rows created since the last sync are missing locally, so an empty replica result also goes to Azure
+    df = _replica_lookup('RP_Invoices', lambda replica: replica.get_invoice(invoice_id))
+    if df is not None and not df.empty:
+        return df
+
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -22,6 +49,7 @@ def get_invoice_data(invoice_id: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 def get_dispute_data(dispute_id: str) -> pd.DataFrame:
+    # Always from Azure: the panel shows the full row, which the replica does not mirror
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -40,16 +68,95 @@ def get_dispute_data(dispute_id: str) -> pd.DataFrame:
         print(f"Error: {e}")
         return pd.DataFrame()
 
-def get_customer_phone(customer_id: str) -> str:
+def get_customer_phones(customer_id: str) -> tuple:
+    """
+    Get every distinct E.164 phone number across the customer's authentication accounts.
+    Returns (phones, skipped), where skipped are the stored numbers that could not be
+    normalized, so the agent can see which numbers are missing from the SMS report.
+    """
+    raw_numbers = _replica_lookup(
+        'CustomerAuthenticationAccounts',
+        lambda replica: replica.get_phone_numbers(customer_id)
+    )
+
+    if not raw_numbers:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            query = get_customer_phones_by_id()
+            cursor.execute(query, [customer_id])
+            
+            raw_numbers = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        except Exception as e:
+            print(f"Error: {e}")
+            return [], []
+
+    phones, skipped = [], []
+    for raw in raw_numbers:
+        phone = normalize_e164(raw)
+        if phone is None:
+            print(f"Skipping phone number that cannot be normalized to E.164: {raw!r}")
+            skipped.append(str(raw))
+        # Different raw formats can normalize to the same number
+        elif phone not in phones:
+            phones.append(phone)
+    return phones, skipped
+
+def get_open_disputes(after: tuple = None, limit: int = 25) -> pd.DataFrame:
+    """
+    Get up to `limit` open disputes, earliest evidence due date first.
+    `after` is the (EvidenceDueBy, ExternalPaymentDisputeId) of the last row already seen.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        query = get_customer_phone_by_id()
-        cursor.execute(query, [customer_id])
-        
+        if after is None:
+            cursor.execute(get_open_disputes_first_page(), [limit])
+        else:
+            due_by, dispute_id = after
+            cursor.execute(get_open_disputes_after(), [limit, due_by, due_by, dispute_id])
+
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        cursor.close()
+        return df
+    except Exception as e:
+        print(f"Error: {e}")
+        return pd.DataFrame()
+
+def count_open_disputes() -> int:
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(get_open_disputes_count())
+
         result = cursor.fetchone()
         cursor.close()
-        return result[0] if result else None
+        return int(result[0]) if result else 0
     except Exception as e:
         print(f"Error: {e}")
-        return None
+        return 0
+
+def load_dispute_bundle(dispute_id: str) -> dict:
+    """Load dispute, invoice and customer phone numbers for a dispute in one go"""
+    dispute_data = get_dispute_data(dispute_id)
+    invoice_data = pd.DataFrame()
+    customer_phones, skipped_phones = [], []
+
+    # Invoice is looked up via the dispute's ServiceId, phone via the invoice's CustomerId
+    if not dispute_data.empty and 'ServiceId' in dispute_data.columns:
+        service_id = dispute_data['ServiceId'].iloc[0]
+        if service_id:
+            invoice_data = get_invoice_data(service_id)
+            if not invoice_data.empty and 'CustomerId' in invoice_data.columns:
+                customer_id = invoice_data['CustomerId'].iloc[0]
+                customer_phones, skipped_phones = get_customer_phones(customer_id)
+
+    return {
+        'dispute_data': dispute_data,
+        'invoice_data': invoice_data,
+        'customer_phones': customer_phones,
+        'skipped_phones': skipped_phones,
+    }
@@ -19,11 +19,55 @@ def get_dispute_by_id() -> str:
     WHERE ExternalPaymentDisputeId = ?
     """
 
-def get_customer_phone_by_id() -> str:
+# Open disputes are paged by keyset on (EvidenceDueBy, ExternalPaymentDisputeId) rather than
+# OFFSET, since the set shrinks as disputes get answered and OFFSET would skip items.
+# EvidenceDueBy is formatted for display only; the cursor is the raw column value, since
+# the formatted string drops datetime2 precision and would no longer compare equal
+OPEN_DISPUTES_FILTER = """
+    d.ExternalPaymentDisputeStatus IN ('needs_response', 'warning_needs_response')
+    AND d.EvidenceDueBy IS NOT NULL
+"""
+
+def get_open_disputes_first_page() -> str:
+    return f"""
+    SELECT TOP (?)
+        d.ExternalPaymentDisputeId,
+        d.ExternalPaymentDisputeReason,
+        d.ServiceId,
+        CONVERT(VARCHAR(23), d.EvidenceDueBy, 126) AS EvidenceDueBy,
+        d.EvidenceDueBy AS EvidenceDueByCursor
+    FROM StripeChargeDisputes d
+    WHERE {OPEN_DISPUTES_FILTER}
+    ORDER BY d.EvidenceDueBy ASC, d.ExternalPaymentDisputeId ASC
+    """
+
+def get_open_disputes_after() -> str:
+    return f"""
+    SELECT TOP (?)
+        d.ExternalPaymentDisputeId,
+        d.ExternalPaymentDisputeReason,
+        d.ServiceId,
+        CONVERT(VARCHAR(23), d.EvidenceDueBy, 126) AS EvidenceDueBy,
+        d.EvidenceDueBy AS EvidenceDueByCursor
+    FROM StripeChargeDisputes d
+    WHERE {OPEN_DISPUTES_FILTER}
+      AND (d.EvidenceDueBy > ? OR (d.EvidenceDueBy = ? AND d.ExternalPaymentDisputeId > ?))
+    ORDER BY d.EvidenceDueBy ASC, d.ExternalPaymentDisputeId ASC
+    """
+
+def get_open_disputes_count() -> str:
+    return f"""
+    SELECT COUNT(*)
+    FROM StripeChargeDisputes d
+    WHERE {OPEN_DISPUTES_FILTER}
+    """
+
+def get_customer_phones_by_id() -> str:
     return """
-    SELECT PhoneNumber
+    SELECT DISTINCT PhoneNumber
     FROM CustomerAuthenticationAccounts
     WHERE CustomerId = ?
+      AND PhoneNumber IS NOT NULL
     """
 
 def get_invoices_query():
@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+from dotenv import load_dotenv
+from db.connection import get_db_connection
+
+# Columns mirrored from Azure SQL. Only what the lookups in data_loader use is copied.
+# Disputes are not mirrored: the dispute panel shows every column of the Azure row,
+# so that row always comes from Azure and the replica only saves the invoice and phone lookups.
+# `key` must be the source table's primary key, so an update to any other column replaces
+# the local row; `modified` must be a monotonically increasing datetime or rowversion column.
+# Incremental syncs never see deleted rows: they are only dropped by the periodic full
+# reconcile, so a row deleted on the source is served until the next reconcile runs.
+REPLICA_TABLES = {
+    "RP_Invoices": {
+        "key": ["InvoiceId"],
+        "indexes": [["CustomerId"]],
+        "columns": {
+            "InvoiceId": "InvoiceId",
+            "CustomerId": "CustomerId",
+            "CustomerFullName": "CustomerFullName",
+            "CompanyName": "CompanyName",
+            "IssuedOn": "CAST(IssuedOn AS VARCHAR(23))",
+        },
+        "modified": "ModifiedOn",
+    },
+    "CustomerAuthenticationAccounts": {
+        "key": ["Id"],
+        "indexes": [["CustomerId"]],
+        "columns": {
+            "Id": "Id",
+            "CustomerId": "CustomerId",
+            "PhoneNumber": "PhoneNumber",
+        },
+        "modified": "ModifiedOn",
+    },
+}
+
+SYNC_BATCH_SIZE = 5000
+
+
+def _sqlite_value(value):
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+def _encode_watermark(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _sqlite_value(value)
+
+
+def _decode_watermark(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class LocalReplica:
+    """
+    SQLite copy of the reference columns we read from Azure SQL.
+    Lookups are only served while every table involved has synced within `max_staleness`
+    seconds; otherwise callers fall back to Azure. Rows deleted on the source are removed
+    by a full key reconcile that runs at most every `reconcile_interval` seconds.
+    """
+
+    def __init__(self, path: str, max_staleness: float = 300, reconcile_interval: float = 3600):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.reconcile_interval = reconcile_interval
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._create_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a sync writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "table_name TEXT PRIMARY KEY, watermark, synced_at REAL, reconciled_at REAL)"
+            )
+            if "reconciled_at" not in [name for name, _ in self._table_columns(conn, "sync_state")]:
+                conn.execute("ALTER TABLE sync_state ADD COLUMN reconciled_at REAL")
+            # Tables dropped from REPLICA_TABLES would otherwise sit in the file, never synced again
+            for (table,) in conn.execute("SELECT table_name FROM sync_state").fetchall():
+                if table not in REPLICA_TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.execute("DELETE FROM sync_state WHERE table_name = ?", [table])
+            for table, spec in REPLICA_TABLES.items():
+                # (column, position in primary key) as reported by PRAGMA table_info
+                expected = [(name, spec["key"].index(name) + 1 if name in spec["key"] else 0) for name in spec["columns"]]
+                existing = self._table_columns(conn, table)
+                if existing and existing != expected:
+                    # Columns or key changed since this file was created: rebuild the table from scratch
+                    conn.execute(f"DROP TABLE {table}")
+                    conn.execute("DELETE FROM sync_state WHERE table_name = ?", [table])
+                columns = ", ".join(spec["columns"])
+                key = ", ".join(spec["key"])
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns}, PRIMARY KEY ({key}))")
+                for index_columns in spec["indexes"]:
+                    name = f"ix_{table}_{'_'.join(index_columns)}"
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index_columns)})")
+
+    @staticmethod
+    def _table_columns(conn: sqlite3.Connection, table: str) -> list:
+        return [(row[1], row[5]) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    def sync_table(self, table: str) -> int:
+        """Pull rows changed since the stored watermark from Azure and upsert them"""
+        spec = REPLICA_TABLES[table]
+        conn = self._conn()
+        row = conn.execute("SELECT watermark FROM sync_state WHERE table_name = ?", [table]).fetchone()
+        watermark = _decode_watermark(row[0]) if row else None
+        full_copy = watermark is None
+
+        select = ", ".join(f"{expr} AS {name}" for name, expr in spec["columns"].items())
+        query = f"SELECT {select}, {spec['modified']} AS _modified FROM {table}"
+        params = []
+        if watermark is not None:
+            # >= re-reads rows sharing the last timestamp; the upsert makes that harmless
+            query += f" WHERE {spec['modified']} >= ?"
+            params.append(watermark)
+        query += f" ORDER BY {spec['modified']}"
+
+        names = list(spec["columns"])
+        placeholders = ", ".join("?" for _ in names)
+        upsert = f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) VALUES ({placeholders})"
+
+        cursor = get_db_connection().cursor()
+        cursor.execute(query, params)
+        synced = 0
+        try:
+            while True:
+                rows = cursor.fetchmany(SYNC_BATCH_SIZE)
+                if not rows:
+                    break
+                with conn:
+                    conn.executemany(upsert, [[_sqlite_value(v) for v in r[:-1]] for r in rows])
+                watermark = rows[-1][-1]
+                synced += len(rows)
+        finally:
+            cursor.close()
+
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT INTO sync_state (table_name, watermark, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (table_name) DO UPDATE SET watermark = excluded.watermark, synced_at = excluded.synced_at",
+                [table, _encode_watermark(watermark), now]
+            )
+            if full_copy:
+                # A full copy has nothing to reconcile until the next interval
+                conn.execute("UPDATE sync_state SET reconciled_at = ? WHERE table_name = ?", [now, table])
+        return synced
+
+    def reconcile_table(self, table: str) -> int:
+        """Delete local rows whose key no longer exists on the source; returns the number removed"""
+        spec = REPLICA_TABLES[table]
+        key = spec["key"]
+        conn = self._conn()
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS temp.source_keys")
+            conn.execute(f"CREATE TEMP TABLE source_keys ({', '.join(key)}, PRIMARY KEY ({', '.join(key)}))")
+
+        insert = f"INSERT OR IGNORE INTO temp.source_keys VALUES ({', '.join('?' for _ in key)})"
+        cursor = get_db_connection().cursor()
+        cursor.execute(f"SELECT {', '.join(spec['columns'][name] for name in key)} FROM {table}")
+        try:
+            while True:
+                rows = cursor.fetchmany(SYNC_BATCH_SIZE)
+                if not rows:
+                    break
+                with conn:
+                    conn.executemany(insert, [[_sqlite_value(v) for v in r] for r in rows])
+        finally:
+            cursor.close()
+
+        match = " AND ".join(f"k.{name} = {table}.{name}" for name in key)
+        with conn:
+            deleted = conn.execute(
+                f"DELETE FROM {table} WHERE NOT EXISTS (SELECT 1 FROM temp.source_keys k WHERE {match})"
+            ).rowcount
+            conn.execute("UPDATE sync_state SET reconciled_at = ? WHERE table_name = ?", [time.time(), table])
+            conn.execute("DROP TABLE temp.source_keys")
+        return deleted
+
+    def _reconcile_due(self, table: str) -> bool:
+        row = self._conn().execute("SELECT reconciled_at FROM sync_state WHERE table_name = ?", [table]).fetchone()
+        return row is not None and (row[0] is None or time.time() - row[0] >= self.reconcile_interval)
+
+    def sync(self) -> dict:
+        """Sync every table, reconciling deletes where due; maps table to (upserted, deleted) or None"""
+        with self._sync_lock:
+            results = {}
+            for table in REPLICA_TABLES:
+                try:
+                    upserted = self.sync_table(table)
+                    # Runs after the incremental sync so the key snapshot is newer than the local rows
+                    deleted = self.reconcile_table(table) if self._reconcile_due(table) else 0
+                    results[table] = (upserted, deleted)
+                except Exception as e:
+                    print(f"Replica sync failed for {table}: {e}")
+                    results[table] = None
+            return results
+
+    def is_fresh(self, *tables: str) -> bool:
+        placeholders = ", ".join("?" for _ in tables)
+        row = self._conn().execute(
+            f"SELECT COUNT(*), MIN(synced_at) FROM sync_state WHERE table_name IN ({placeholders})",
+            list(tables)
+        ).fetchone()
+        return row[0] == len(tables) and time.time() - row[1] <= self.max_staleness
+
+    def _query_df(self, query: str, params: list) -> pd.DataFrame:
+        cursor = self._conn().execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+
+    def get_invoice(self, invoice_id: str) -> pd.DataFrame:
+        return self._query_df(
+            "SELECT InvoiceId, CustomerId, CustomerFullName, CompanyName, IssuedOn "
+            "FROM RP_Invoices WHERE InvoiceId = ?",
+            [_sqlite_value(invoice_id)]
+        )
+
+    def get_phone_numbers(self, customer_id: str) -> list:
+        rows = self._conn().execute(
+            "SELECT DISTINCT PhoneNumber FROM CustomerAuthenticationAccounts "
+            "WHERE CustomerId = ? AND PhoneNumber IS NOT NULL",
+            [_sqlite_value(customer_id)]
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def start_background_sync(self, interval: float):
+        def run():
+            while True:
+                self.sync()
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="replica-sync", daemon=True)
+        thread.start()
+        return thread
+
+
+@st.cache_resource
+def get_local_replica():
+    """Return the process-wide replica, or None when LOCAL_REPLICA_PATH is not configured"""
+    load_dotenv()
+    path = st.secrets.get("LOCAL_REPLICA_PATH", os.getenv("LOCAL_REPLICA_PATH"))
+    if not path:
+        return None
+
+    replica = LocalReplica(
+        path,
+        max_staleness=float(os.getenv("LOCAL_REPLICA_MAX_STALENESS_SECONDS", "300")),
+        reconcile_interval=float(os.getenv("LOCAL_REPLICA_RECONCILE_SECONDS", "3600"))
+    )
+    replica.start_background_sync(float(os.getenv("LOCAL_REPLICA_SYNC_INTERVAL_SECONDS", "60")))
+    return replica
+
+
+if __name__ == "__main__":
+    # One-off sync, e.g. from cron: LOCAL_REPLICA_PATH=replica.db python -m db.replica
+    load_dotenv()
+    replica = LocalReplica(
+        os.environ["LOCAL_REPLICA_PATH"],
+        reconcile_interval=float(os.getenv("LOCAL_REPLICA_RECONCILE_SECONDS", "3600"))
+    )
+    for table, result in replica.sync().items():
+        print(f"{table}: {'failed' if result is None else f'{result[0]} rows upserted, {result[1]} deleted'}")
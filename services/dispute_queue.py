@@ -0,0 +1,114 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+import time
+import streamlit as st
+from dotenv import load_dotenv
+from db.data_loader import load_dispute_bundle
+from utils.artifact_store import get_artifact_store
+
+# A dispute that came back empty may only be missing because of a transient Azure error,
+# so it is retried after a few seconds instead of being served for the full max_age
+EMPTY_BUNDLE_MAX_AGE = 5
+
+
+def dispute_key(dispute_id: str) -> str:
+    return f"dispute:{dispute_id}"
+
+
+class DisputePrefetcher:
+    """
+    Process-wide loader for dispute bundles, shared by every session's work queue.
+    Bundles live in the artifact store under dispute:<id>, so they count towards its caps,
+    and a dispute requested by several sessions at once is only loaded once.
+    A dispute an agent is waiting for is loaded on their own thread; the worker pool only
+    runs background prefetches, and prefetches are dropped while every worker is busy.
+    """
+
+    def __init__(self, store, max_age: float = 120, max_workers: int = 4, loader=load_dispute_bundle):
+        self.store = store
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self.loader = loader
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispute-prefetch")
+        self._in_flight = {}
+        self._background = 0
+        self._lock = threading.Lock()
+
+    def _claim(self, dispute_id: str, max_age: float):
+        """
+        Return (bundle, future, owned). Either a fresh stored bundle, the future of a load
+        already in flight, or a new future the caller owns and must complete with _run.
+        Callers must hold self._lock.
+        """
+        future = self._in_flight.get(dispute_id)
+        if future is not None:
+            return None, future, False
+        bundle = self.store.get(dispute_key(dispute_id))
+        if bundle is not None:
+            if bundle['dispute_data'].empty:
+                max_age = min(max_age, EMPTY_BUNDLE_MAX_AGE)
+            # Bundles older than max_age are reloaded so revisiting a dispute never shows stale data
+            if time.time() - bundle.get('loaded_at', 0) <= max_age:
+                return bundle, None, False
+        future = Future()
+        self._in_flight[dispute_id] = future
+        return None, future, True
+
+    def _run(self, dispute_id: str, future: Future):
+        future.set_running_or_notify_cancel()
+        try:
+            bundle = self.loader(dispute_id)
+            bundle['loaded_at'] = time.time()
+            self.store.put(dispute_key(dispute_id), bundle)
+            future.set_result(bundle)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            # Stored before leaving _in_flight, so a concurrent get always finds one or the other
+            with self._lock:
+                self._in_flight.pop(dispute_id, None)
+
+    def _run_in_background(self, dispute_id: str, future: Future):
+        try:
+            self._run(dispute_id, future)
+        finally:
+            with self._lock:
+                self._background -= 1
+
+    def get(self, dispute_id: str, max_age: float = None) -> dict:
+        """Return the bundle for a dispute, loading it inline unless a load is already in flight"""
+        with self._lock:
+            bundle, future, owned = self._claim(dispute_id, self.max_age if max_age is None else max_age)
+        if bundle is not None:
+            return bundle
+        if owned:
+            self._run(dispute_id, future)
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error loading dispute {dispute_id}: {e}")
+            return self.loader(dispute_id)
+
+    def prefetch(self, dispute_ids: list):
+        """Start loading the given disputes in the background while there are idle workers"""
+        for dispute_id in dispute_ids:
+            with self._lock:
+                # Never queue behind busy workers: a queued prefetch is stale by the time it runs
+                if self._background >= self.max_workers:
+                    return
+                _, future, owned = self._claim(dispute_id, self.max_age)
+                if not owned:
+                    continue
+                self._background += 1
+            self._executor.submit(self._run_in_background, dispute_id, future)
+
+
+@st.cache_resource
+def get_dispute_prefetcher() -> DisputePrefetcher:
+    load_dotenv()
+    return DisputePrefetcher(
+        get_artifact_store(),
+        max_age=float(os.getenv("DISPUTE_BUNDLE_MAX_AGE_SECONDS", "120")),
+        max_workers=int(os.getenv("DISPUTE_PREFETCH_WORKERS", "4")),
+    )
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+import time
+from dotenv import load_dotenv
+import pandas as pd
+import stripe
+
+load_dotenv()
+
+# Transient failures worth retrying with the same idempotency key. A 500 is not one of them:
+# Stripe stores it under the key, so a retry would only replay the same error
+RETRYABLE_HTTP_STATUSES = {409, 429, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, stripe.APIConnectionError):
+        # The response was lost; the idempotency key makes resending safe
+        return True
+    # Stripe says explicitly whether a retry can succeed; honour it like stripe-python does
+    headers = {k.lower(): v for k, v in (getattr(error, "headers", None) or {}).items()}
+    should_retry = headers.get("stripe-should-retry")
+    if should_retry is not None:
+        return should_retry == "true"
+    return getattr(error, "http_status", None) in RETRYABLE_HTTP_STATUSES
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_evidence(submission: dict) -> dict:
+    """Map the tool's dispute response fields onto Stripe's evidence parameters"""
+    evidence = {
+        "product_description": submission["description"],
+        "uncategorized_text": (
+            f"Response: {submission['selected_option']}\n"
+            f"Product or service type: {submission['product_type']}"
+        ),
+    }
+    if submission.get("customer_name"):
+        evidence["customer_name"] = submission["customer_name"]
+    if submission.get("service_date"):
+        evidence["service_date"] = submission["service_date"]
+    return evidence
+
+
+class StripeEvidenceService:
+    """
+    Uploads evidence PDFs and updates disputes through the Stripe API, many disputes at a time.
+
+    A submission is a dict with dispute_id, selected_option, product_type, description,
+    optional customer_name/service_date and `files`, a mapping of Stripe evidence field
+    (e.g. customer_communication) to a local PDF path. Every request carries an idempotency
+    key derived from the dispute and its content, so retries and re-running a batch never
+    upload or submit twice. Stripe replays a stored failure such as a 500 for the same key,
+    so a result with retry_with_new_key set must be resent with the submission's
+    `retry_generation` increased. Set STRIPE_API_BASE to point the client at a local stand-in.
+    """
+
+    def __init__(self, api_key: str = None, api_base: str = None, max_workers: int = 8,
+                 max_retries: int = 3, backoff_seconds: float = 0.5):
+        api_key = api_key or os.getenv("STRIPE_API_KEY")
+        if not api_key:
+            raise ValueError("STRIPE_API_KEY is not set in environment.")
+        api_base = api_base or os.getenv("STRIPE_API_BASE")
+        base_addresses = {"api": api_base, "files": api_base} if api_base else {}
+        # Retries are handled here so they share one idempotency key and show up in the report
+        self.client = stripe.StripeClient(api_key, base_addresses=base_addresses, max_network_retries=0)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+    def _with_retries(self, request, attempts: list):
+        for attempt in range(self.max_retries + 1):
+            attempts[0] += 1
+            try:
+                return request()
+            except stripe.StripeError as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+
+    def _idempotency_prefix(self, submission: dict, file_digests: dict, submit: bool) -> str:
+        content = json.dumps(
+            {"evidence": build_evidence(submission), "files": file_digests, "submit": submit},
+            sort_keys=True
+        )
+        prefix = f"dispute-evidence-{submission['dispute_id']}-{hashlib.sha256(content.encode()).hexdigest()[:24]}"
+        # Automatic retries share one key; a resend after a stored failure needs a fresh one
+        generation = submission.get("retry_generation", 0)
+        return f"{prefix}-r{generation}" if generation else prefix
+
+    def submit_evidence(self, submission: dict, submit: bool = True) -> dict:
+        """Upload the submission's files and attach the evidence to its dispute"""
+        started = time.perf_counter()
+        attempts = [0]
+        result = {
+            "dispute_id": submission["dispute_id"],
+            "status": "failed",
+            "dispute_status": None,
+            "file_ids": {},
+            "attempts": 0,
+            "idempotency_key": None,
+            "error": None,
+            "retry_with_new_key": False,
+        }
+        try:
+            files = submission.get("files") or {}
+            file_digests = {field: _file_digest(path) for field, path in files.items()}
+            key_prefix = self._idempotency_prefix(submission, file_digests, submit)
+            result["idempotency_key"] = key_prefix
+
+            evidence = build_evidence(submission)
+            for field, path in files.items():
+                def upload(path=path, field=field):
+                    with open(path, "rb") as f:
+                        return self.client.files.create(
+                            params={"purpose": "dispute_evidence", "file": f},
+                            options={"idempotency_key": f"{key_prefix}-file-{field}"}
+                        )
+                uploaded = self._with_retries(upload, attempts)
+                result["file_ids"][field] = uploaded.id
+                evidence[field] = uploaded.id
+
+            dispute = self._with_retries(
+                lambda: self.client.disputes.update(
+                    submission["dispute_id"],
+                    params={"evidence": evidence, "submit": submit},
+                    options={"idempotency_key": f"{key_prefix}-update"}
+                ),
+                attempts
+            )
+            result["status"] = "submitted" if submit else "saved"
+            result["dispute_status"] = dispute.status
+        except Exception as e:
+            print(f"Error submitting evidence for {submission['dispute_id']}: {e}")
+            result["error"] = str(e)
+            # Stripe answered with a failure it stores under the key; lost or throttled requests keep theirs
+            result["retry_with_new_key"] = (
+                isinstance(e, stripe.StripeError) and e.http_status is not None and not _is_retryable(e)
+            )
+
+        result["attempts"] = attempts[0]
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def submit_batch(self, submissions: list, submit: bool = True) -> pd.DataFrame:
+        """Submit many disputes concurrently and return one result row per dispute"""
+        if not submissions:
+            return pd.DataFrame()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(submissions))) as pool:
+            results = list(pool.map(lambda s: self.submit_evidence(s, submit), submissions))
+        return pd.DataFrame(results)
@@ -9,9 +9,94 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from io import BytesIO
+import heapq
+import queue
+import tempfile
+import threading
 
 load_dotenv()
 
+MESSAGES_TABLE_HEADER = ['Date', 'SMS SID', 'Status', 'Message']
+MESSAGES_TABLE_COL_WIDTHS = [1.5*inch, 1.8*inch, 0.8*inch, 3.4*inch]
+MESSAGES_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 6),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 1), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+])
+
+# Process-wide bound on concurrent Twilio page fetches across all sessions. It is held only
+# while pulling from Twilio, never while waiting on a full queue, so merges cannot deadlock it
+_FETCH_SLOTS = threading.BoundedSemaphore(int(os.getenv("TWILIO_FETCH_WORKERS", "8")))
+_END_OF_STREAM = object()
+# How often a producer blocked on a full queue checks whether the consumer went away
+_QUEUE_PUT_TIMEOUT = 0.5
+
+# Rows kept in memory for the on-screen preview and the AI summary, which only reads the first 200
+MESSAGES_PREVIEW_LIMIT = 200
+
+
+class _StreamingStory(list):
+    """
+    Story list that refills itself from a flowable iterator as platypus consumes it,
+    so only the flowable currently being laid out is held in memory.
+    """
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        if not super().__len__():
+            flowable = next(self._source, None)
+            if flowable is not None:
+                self.append(flowable)
+        return super().__len__()
+
+
+def _throttled(iterator):
+    while True:
+        with _FETCH_SLOTS:
+            item = next(iterator, _END_OF_STREAM)
+        if item is _END_OF_STREAM:
+            return
+        yield item
+
+
+def _message_row(msg) -> dict:
+    return {
+        'Date': msg.date_sent.strftime('%Y-%m-%d %H:%M:%S'),
+        'SMS SID': msg.sid,
+        'Status': msg.status,
+        'Message': msg.body
+    }
+
+
+def _messages_table(rows, styles) -> Table:
+    table_data = [MESSAGES_TABLE_HEADER]
+    for row in rows:
+        date_para = Paragraph(row['Date'], styles['Normal'])
+        sid_para = Paragraph(row['SMS SID'][:20] + '...' if len(row['SMS SID']) > 20 else row['SMS SID'], styles['Normal'])
+        status_para = Paragraph(row['Status'], styles['Normal'])
+        message_para = Paragraph(row['Message'], styles['Normal'])
+        table_data.append([date_para, sid_para, status_para, message_para])
+
+    table = Table(table_data, colWidths=MESSAGES_TABLE_COL_WIDTHS, repeatRows=1)
+    table.setStyle(MESSAGES_TABLE_STYLE)
+    return table
+
+
 class TwilioMessageService:
     def __init__(self):
         # API Key Authentication
@@ -35,14 +120,7 @@ class TwilioMessageService:
                 date_sent_before=end_date
             )
             
-            data = []
-            for msg in messages:
-                data.append({
-                    'Date': msg.date_sent.strftime('%Y-%m-%d %H:%M:%S'),
-                    'SMS SID': msg.sid,
-                    'Status': msg.status,
-                    'Message': msg.body
-                })
+            data = [_message_row(msg) for msg in messages]
             
             return pd.DataFrame(data)
         except Exception as e:
@@ -71,40 +149,153 @@ class TwilioMessageService:
         elements.append(Spacer(1, 20))
         
         if not df.empty:
-            # Prepare table data
-            table_data = [['Date', 'SMS SID', 'Status', 'Message']]
-            for _, row in df.iterrows():
-                date_para = Paragraph(row['Date'], styles['Normal'])
-                sid_para = Paragraph(row['SMS SID'][:20] + '...' if len(row['SMS SID']) > 20 else row['SMS SID'], styles['Normal'])
-                status_para = Paragraph(row['Status'], styles['Normal'])
-                message_para = Paragraph(row['Message'], styles['Normal'])
-                table_data.append([date_para, sid_para, status_para, message_para])
-            
             elements.append(Spacer(1, 12))
-            table = Table(table_data, colWidths=[1.5*inch, 1.8*inch, 0.8*inch, 3.4*inch], repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 0), (-1, 0), 6),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 1), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-            ]))
-            elements.append(table)
+            elements.append(_messages_table((row for _, row in df.iterrows()), styles))
         else:
             no_data = Paragraph("No messages found in the specified date range.", styles['Normal'])
             elements.append(no_data)
         
         doc.build(elements)
         buffer.seek(0)
-        return buffer.getvalue()
\ No newline at end of file
+        return buffer.getvalue()
+
+    def iter_messages_for_number(self, phone_number: str, days_back: int = 90, page_size: int = 50):
+        """Yield message rows one Twilio page at a time instead of listing the whole history"""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+
+        messages = self.client.messages.stream(
+            to=phone_number,
+            date_sent_after=start_date,
+            date_sent_before=end_date,
+            page_size=page_size
+        )
+        for msg in _throttled(iter(messages)):
+            yield _message_row(msg)
+
+    def iter_messages_for_numbers(self, phone_numbers: list, days_back: int = 90, page_size: int = 50,
+                                  errors: list = None):
+        """
+        Fetch several numbers concurrently and yield one newest-first stream of rows,
+        de-duplicated by SID. Each number is paged into its own queue of at most one page,
+        so total wall time tracks the slowest number rather than the sum while memory stays
+        bounded by page size. A number that fails is reported in `errors` and the others continue.
+        """
+        if len(phone_numbers) == 1:
+            yield from self.iter_messages_for_number(phone_numbers[0], days_back, page_size)
+            return
+
+        errors = errors if errors is not None else []
+        stop = threading.Event()
+        queues = []
+        for phone_number in phone_numbers:
+            rows = queue.Queue(maxsize=page_size)
+            threading.Thread(
+                target=self._fill_queue,
+                args=(rows, phone_number, days_back, page_size, stop, errors),
+                name="twilio-fetch",
+                daemon=True
+            ).start()
+            queues.append(rows)
+
+        seen_sids = set()
+        try:
+            # Each Twilio stream is newest-first, so a k-way merge keeps the report ordered
+            merged = heapq.merge(*(self._drain_queue(rows) for rows in queues), key=lambda row: row['Date'], reverse=True)
+            for row in merged:
+                if row['SMS SID'] in seen_sids:
+                    continue
+                seen_sids.add(row['SMS SID'])
+                yield row
+        finally:
+            stop.set()
+
+    @staticmethod
+    def _put(rows: queue.Queue, item, stop: threading.Event) -> bool:
+        """Put with a timeout so a producer notices when the consumer has stopped reading"""
+        while not stop.is_set():
+            try:
+                rows.put(item, timeout=_QUEUE_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill_queue(self, rows: queue.Queue, phone_number: str, days_back: int, page_size: int,
+                    stop: threading.Event, errors: list):
+        try:
+            for row in self.iter_messages_for_number(phone_number, days_back, page_size):
+                if not self._put(rows, row, stop):
+                    return
+        except Exception as e:
+            # One failing number should not drop the evidence for the others, but it must be reported
+            print(f"Error retrieving messages for {phone_number}: {e}")
+            errors.append(f"{phone_number}: {e}")
+        finally:
+            self._put(rows, _END_OF_STREAM, stop)
+
+    @staticmethod
+    def _drain_queue(rows: queue.Queue):
+        while True:
+            row = rows.get()
+            if row is _END_OF_STREAM:
+                return
+            yield row
+
+    def write_messages_pdf(self, phone_number: str, rows, chunk_size: int = 50, errors: list = None,
+                           directory: str = None):
+        """
+        Stream message rows into a PDF temp file in `directory`, one table chunk at a time.
+        Returns (pdf_path, total_messages, preview_df, errors); the caller owns the file.
+        Retrieval errors are appended to `errors` (which may already hold errors from the
+        row source) and, when there are any, the PDF is marked as incomplete.
+        Rows are not retained, but reportlab keeps every finished page in memory until the
+        file is saved, so peak memory still grows with the report (bench/sms_report_memory.py).
+        """
+        styles = getSampleStyleSheet()
+        preview = []
+        state = {'total': 0}
+        errors = errors if errors is not None else []
+
+        def flowables():
+            yield Paragraph("<b>SMS Messages Report from Twilio</b>", styles['Title'])
+            yield Spacer(1, 12)
+            yield Paragraph(f"<b>Number:</b> {phone_number}", styles['Normal'])
+            yield Spacer(1, 20)
+
+            chunk = []
+            try:
+                for row in rows:
+                    state['total'] += 1
+                    if len(preview) < MESSAGES_PREVIEW_LIMIT:
+                        preview.append(row)
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield _messages_table(chunk, styles)
+                        chunk = []
+            except Exception as e:
+                print(f"Error retrieving messages: {e}")
+                errors.append(str(e))
+            if chunk:
+                yield _messages_table(chunk, styles)
+
+            if state['total']:
+                yield Spacer(1, 12)
+                yield Paragraph(f"<b>Total SMS messages:</b> {state['total']}", styles['Normal'])
+            elif not errors:
+                yield Paragraph("No messages found in the specified date range.", styles['Normal'])
+
+            if errors:
+                yield Spacer(1, 12)
+                yield Paragraph(
+                    "<font color='red'><b>INCOMPLETE REPORT:</b> message retrieval failed, so this report "
+                    f"may be missing messages. Errors: {'; '.join(errors)}</font>",
+                    styles['Normal']
+                )
+
+        tmp = tempfile.NamedTemporaryFile(prefix="sms_report_", suffix=".pdf", dir=directory, delete=False)
+        tmp.close()
+        doc = SimpleDocTemplate(tmp.name, pagesize=A4, pageCompression=1)
+        doc.build(_StreamingStory(flowables()))
+
+        return tmp.name, state['total'], pd.DataFrame(preview, columns=MESSAGES_TABLE_HEADER), errors
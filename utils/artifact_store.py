@@ -0,0 +1,203 @@
+from collections import OrderedDict
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import pandas as pd
+import streamlit as st
+from dotenv import load_dotenv
+
+
+def estimate_size(value) -> int:
+    """Approximate in-memory size of an artifact in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "path", "size")
+
+    def __init__(self, value=None, path=None, size=0):
+        self.value = value
+        self.path = path
+        self.size = size
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+
+class ArtifactStore:
+    """
+    Process-wide LRU store for DataFrames, PDFs and summaries shared by all sessions.
+    Sessions keep only the string keys; entries are evicted least-recently-used first
+    once the memory or disk cap is exceeded, so a key may stop resolving at any time.
+
+    The store owns every file in `spill_dir`: files left by a previous process are deleted
+    on startup and the directory is emptied at exit, so the disk cap accounts for all of it.
+    Without a `spill_dir`, a private temp directory is created and removed at exit.
+    """
+
+    def __init__(self, max_memory_bytes: int, max_disk_bytes: int, spill_threshold_bytes: int, spill_dir: str = None):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self._owns_spill_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="dispute_artifacts_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._clear_spill_dir()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        atexit.register(self.close)
+
+    def put(self, key: str, value) -> str:
+        """Store a value under key, spilling large bytes payloads (PDFs) to disk"""
+        if isinstance(value, (bytes, bytearray)) and len(value) >= self.spill_threshold_bytes:
+            fd, path = tempfile.mkstemp(prefix="artifact_", suffix=".bin", dir=self.spill_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            return self.put_file(key, path)
+
+        entry = _Entry(value=value, size=estimate_size(value))
+        with self._lock:
+            self._replace(key, entry)
+        return key
+
+    def put_file(self, key: str, path: str) -> str:
+        """Take ownership of a file on disk; it is deleted when the entry is replaced or evicted"""
+        entry = _Entry(path=path, size=os.path.getsize(path))
+        with self._lock:
+            self._replace(key, entry)
+        return key
+
+    def get(self, key: str):
+        """Return the stored value, the bytes of a spilled payload, or None if absent/evicted"""
+        with self._lock:
+            entry = self._touch(key)
+            if entry is None:
+                return None
+            if not entry.on_disk:
+                return entry.value
+            path = entry.path
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_path(self, key: str):
+        """Return the file path of a disk-backed entry, or None"""
+        with self._lock:
+            entry = self._touch(key)
+            return entry.path if entry is not None and entry.on_disk else None
+
+    def close(self):
+        """Drop every entry and delete the spilled files; registered to run at exit"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+            self.disk_bytes = 0
+        if self._owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        else:
+            self._clear_spill_dir()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            disk_entries = sum(1 for e in self._entries.values() if e.on_disk)
+            return {
+                "entries": len(self._entries),
+                "memory_entries": len(self._entries) - disk_entries,
+                "disk_entries": disk_entries,
+                "memory_bytes": self.memory_bytes,
+                "memory_cap_bytes": self.max_memory_bytes,
+                "disk_bytes": self.disk_bytes,
+                "disk_cap_bytes": self.max_disk_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _clear_spill_dir(self):
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            if os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # Internal helpers, callers must hold self._lock
+
+    def _touch(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _replace(self, key: str, entry: _Entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._release(old)
+        self._entries[key] = entry
+        if entry.on_disk:
+            self.disk_bytes += entry.size
+        else:
+            self.memory_bytes += entry.size
+        self._evict()
+
+    def _release(self, entry: _Entry):
+        if entry.on_disk:
+            self.disk_bytes -= entry.size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        else:
+            self.memory_bytes -= entry.size
+
+    def _evict(self):
+        # The most recent entry is kept even if it alone exceeds a cap
+        for key in list(self._entries)[:-1]:
+            if self.memory_bytes <= self.max_memory_bytes and self.disk_bytes <= self.max_disk_bytes:
+                break
+            entry = self._entries[key]
+            over_memory = not entry.on_disk and self.memory_bytes > self.max_memory_bytes
+            over_disk = entry.on_disk and self.disk_bytes > self.max_disk_bytes
+            if over_memory or over_disk:
+                del self._entries[key]
+                self._release(entry)
+                self.evictions += 1
+
+
+@st.cache_resource
+def get_artifact_store() -> ArtifactStore:
+    load_dotenv()
+    mb = 1024 * 1024
+    return ArtifactStore(
+        max_memory_bytes=int(os.getenv("ARTIFACT_STORE_MAX_MEMORY_MB", "512")) * mb,
+        max_disk_bytes=int(os.getenv("ARTIFACT_STORE_MAX_DISK_MB", "2048")) * mb,
+        spill_threshold_bytes=int(os.getenv("ARTIFACT_STORE_SPILL_THRESHOLD_MB", "1")) * mb,
+        # A fixed directory, so a restart cleans up after a process that was killed;
+        # every server process needs its own
+        spill_dir=os.getenv("ARTIFACT_STORE_DIR") or os.path.join(tempfile.gettempdir(), "dispute_artifacts"),
+    )
@@ -0,0 +1,41 @@
+import re
+
+
+def normalize_e164(raw) -> str:
+    """
+    Normalize a stored phone number to E.164 (+<country><number>).
+    Only numbers written with an explicit international prefix (+ or 00) are accepted;
+    national formats return None rather than guessing a country code, since a wrong
+    guess would pull a stranger's SMS history into the evidence.
+
+    Run the checks below with: python -m doctest utils/phone_numbers.py
+
+    >>> normalize_e164("+34 612 34 56 78")
+    '+34612345678'
+    >>> normalize_e164("0044 (7700) 900-123")
+    '+447700900123'
+    >>> normalize_e164("612345678") is None
+    True
+    >>> normalize_e164("(555) 123-4567") is None
+    True
+    >>> normalize_e164("+0612345678") is None
+    True
+    >>> normalize_e164("+1234") is None
+    True
+    >>> normalize_e164(None) is None
+    True
+    """
+    if raw is None:
+        return None
+    value = str(raw).strip()
+    digits = re.sub(r"\D", "", value)
+    if value.startswith("+"):
+        pass
+    elif value.startswith("00"):
+        # International dialing prefix written as 00 instead of +
+        digits = digits[2:]
+    else:
+        return None
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return f"+{digits}"